@@ -3,13 +3,17 @@ Database connection and helper functions for webhook receiver
 Updated for production schema: auto_apply_cand, parsed_requirements, job_application_tracking
 Schema version: November 2025 (min_payrate/max_payrate, duration as TEXT)
 """
-from supabase import create_client, Client
+from supabase import create_client, Client, ClientOptions
+import httpx
+import logging
 import os
 from dotenv import load_dotenv
 from typing import Dict, Optional
 
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
 # Initialize Supabase client
 supabase_url = os.getenv("SUPABASE_URL")
 supabase_key = os.getenv("SUPABASE_KEY")
@@ -17,7 +21,23 @@ supabase_key = os.getenv("SUPABASE_KEY")
 if not supabase_url or not supabase_key:
     raise ValueError("❌ SUPABASE_URL and SUPABASE_KEY must be set in .env file")
 
-supabase: Client = create_client(supabase_url, supabase_key)
+# Shared keep-alive pool sized to the notification concurrency, so RPC calls
+# reuse warm TLS connections instead of handshaking per request
+_max_connections = int(os.getenv("MAX_CONCURRENT_TASKS", "20"))
+_http_client = httpx.Client(
+    limits=httpx.Limits(
+        max_connections=_max_connections * 2,
+        max_keepalive_connections=_max_connections,
+        keepalive_expiry=60.0
+    ),
+    timeout=httpx.Timeout(10.0, connect=3.0)
+)
+
+supabase: Client = create_client(
+    supabase_url,
+    supabase_key,
+    options=ClientOptions(httpx_client=_http_client)
+)
 
 
 def get_application_details(cand_id: int, requirement_id: str) -> Optional[Dict]:
@@ -32,7 +52,7 @@ def get_application_details(cand_id: int, requirement_id: str) -> Optional[Dict]
         Dictionary with candidate info, requirement info, and application details
     """
     try:
-        print(f"🔍 Querying database for cand_id: {cand_id}, requirement_id: {requirement_id}")
+        logger.debug("🔍 Querying database for cand_id: %s, requirement_id: %s", cand_id, requirement_id)
         
         # Call stored procedure using RPC
         response = supabase.rpc(
@@ -44,20 +64,23 @@ def get_application_details(cand_id: int, requirement_id: str) -> Optional[Dict]
         ).execute()
         
         if not response.data or len(response.data) == 0:
-            print(f"⏳ Application not found or both notifications already sent")
+            logger.info("⏳ Application not found or both notifications already sent")
             return None
         
         app = response.data[0]
         
-        # Build full name
-        full_name = f"{app['candidate_first_name']} {app['candidate_last_name']}".strip()
+        first_name = app['candidate_first_name']
+        last_name = app['candidate_last_name']
+        
+        # Build full name (skips missing parts, no trailing-space strip needed)
+        full_name = " ".join(filter(None, (first_name, last_name)))
         
         # Extract candidate info
         candidate_info = {
         'cand_id': app['cand_id'],
         'candidate_name': full_name,
-        'candidate_first_name': app['candidate_first_name'],
-        'candidate_last_name': app['candidate_last_name'],
+        'candidate_first_name': first_name,
+        'candidate_last_name': last_name,
         'candidate_email': app['candidate_email'],
         'candidate_mobile': app.get('candidate_mobile'),
         'candidate_home': app.get('candidate_home'),
@@ -96,19 +119,18 @@ def get_application_details(cand_id: int, requirement_id: str) -> Optional[Dict]
         if requirement_info['is_remote_location']:
             location = 'Remote'
         else:
-            location_parts = []
-            if requirement_info['requirement_location']:
-                location_parts.append(requirement_info['requirement_location'])
-            if requirement_info['requirement_zipcode']:
-                location_parts.append(requirement_info['requirement_zipcode'])
-            location = ', '.join(location_parts) or 'Location TBD'
+            city = requirement_info['requirement_location']
+            zipcode = requirement_info['requirement_zipcode']
+            location = f"{city}, {zipcode}" if city and zipcode else city or zipcode or 'Location TBD'
         
         requirement_info['location'] = location
         
-        print(f"✅ Found application: {requirement_info['requirement_title']} for {full_name}")
-        print(f"   Similarity Score: {requirement_info['similarity_score']:.4f}")
-        print(f"   Status: {application_status}")
-        print(f"   Email sent={email_sent}, SMS sent={sms_sent}")
+        logger.info("✅ Found application: %s for %s", requirement_info['requirement_title'], full_name)
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(
+                "   Similarity Score: %.4f, Status: %s, Email sent=%s, SMS sent=%s",
+                requirement_info['similarity_score'], application_status, email_sent, sms_sent
+            )
         
         return {
             'candidate': candidate_info,
@@ -121,41 +143,64 @@ def get_application_details(cand_id: int, requirement_id: str) -> Optional[Dict]
         }
         
     except Exception as e:
-        print(f"❌ Error fetching application details: {str(e)}")
-        import traceback
-        traceback.print_exc()
+        # Full traceback only when debugging
+        logger.error("❌ Error fetching application details: %s", e,
+                     exc_info=logger.isEnabledFor(logging.DEBUG))
         return None
 
 
-def mark_email_sent(application_id: int) -> bool:
+def mark_sent(application_id: int, email: bool = False, sms: bool = False) -> bool:
     """
-    Mark an application as email sent
+    Mark an application's email and/or SMS as sent in a single UPDATE
     
     Args:
         application_id: The application_id to update
+        email: Set email_sent/email_sent_at
+        sms: Set sms_sent/sms_sent_at
         
     Returns:
-        True if successful, False otherwise
+        True if successful (or nothing to mark), False otherwise
     """
+    if not email and not sms:
+        return True
+    
+    # 'now' is resolved by Postgres, so the timestamp uses the DB clock
+    update = {}
+    if email:
+        update['email_sent'] = True
+        update['email_sent_at'] = 'now'
+    if sms:
+        update['sms_sent'] = True
+        update['sms_sent_at'] = 'now'
+    
     try:
-        from datetime import datetime
-        
         response = supabase.table('job_application_tracking')\
-            .update({
-                'email_sent': True,
-                'email_sent_at': datetime.now().isoformat()
-            })\
+            .update(update)\
             .eq('application_id', application_id)\
             .execute()
         
-        print(f"✅ Marked application_id {application_id} as email_sent=True")
+        logger.info("✅ Marked application_id %s as email_sent=%s, sms_sent=%s",
+                    application_id, email, sms)
         return True
         
     except Exception as e:
-        print(f"❌ Error updating email_sent status: {str(e)}")
+        logger.error("❌ Error updating sent status: %s", e)
         return False
 
 
+def mark_email_sent(application_id: int) -> bool:
+    """
+    Mark an application as email sent
+    
+    Args:
+        application_id: The application_id to update
+        
+    Returns:
+        True if successful, False otherwise
+    """
+    return mark_sent(application_id, email=True)
+
+
 def mark_sms_sent(application_id: int) -> bool:
     """
     Mark an application as SMS sent
@@ -166,20 +211,4 @@ def mark_sms_sent(application_id: int) -> bool:
     Returns:
         True if successful, False otherwise
     """
-    try:
-        from datetime import datetime
-        
-        response = supabase.table('job_application_tracking')\
-            .update({
-                'sms_sent': True,
-                'sms_sent_at': datetime.now().isoformat()
-            })\
-            .eq('application_id', application_id)\
-            .execute()
-        
-        print(f"✅ Marked application_id {application_id} as sms_sent=True")
-        return True
-        
-    except Exception as e:
-        print(f"❌ Error updating sms_sent status: {str(e)}")
-        return False
\ No newline at end of file
+    return mark_sent(application_id, sms=True)
@@ -2,8 +2,12 @@
 Email template renderer for job match notifications
 """
 from datetime import datetime
+from functools import lru_cache
+from string import Template
 import os
+import re
 
+@lru_cache(maxsize=1)
 def load_email_template() -> str:
     """Load the HTML email template from file in the same directory as this file."""
     template_path = os.path.join(
@@ -23,6 +27,13 @@ def get_inline_template() -> str:
     # Ideally paste your minimal HTML here, or just inform about missing template
     return "<html><body>Notification template missing.</body></html>"
 
+def compile_email_template(template: str) -> Template:
+    """Convert {{var}} placeholders to a string.Template (literal $ signs are escaped)."""
+    return Template(re.sub(r'\{\{(\w+)\}\}', r'${\1}', template.replace('$', '$$')))
+
+# Compiled once at import; rendering is a single substitution pass
+_COMPILED_TEMPLATE = compile_email_template(load_email_template())
+
 def render_email_template(
     candidate_name: str,
     job_title: str,
@@ -37,7 +48,6 @@ def render_email_template(
     """
     Render the email template with actual data
     """
-    template = load_email_template()
     if not applied_at:
         applied_at = datetime.now().strftime("%b %d, %Y at %I:%M %p")
     if len(short_description) > 250:
@@ -50,22 +60,23 @@ def render_email_template(
     privacy_link = "https://rangam.com/privacy"
     unsubscribe_link = "https://rangam.com/unsubscribe"
 
-    # Replace all template variables
-    rendered = template.replace('{{candidate_name}}', candidate_name)
-    rendered = rendered.replace('{{job_title}}', job_title)
-    rendered = rendered.replace('{{company_name}}', company_name)
-    rendered = rendered.replace('{{location}}', location)
-    rendered = rendered.replace('{{job_type}}', job_type)
-    rendered = rendered.replace('{{match_score}}', str(match_score))
-    rendered = rendered.replace('{{short_description}}', short_description)
-    rendered = rendered.replace('{{application_status}}', application_status)
-    rendered = rendered.replace('{{applied_at}}', applied_at)
-    rendered = rendered.replace('{{job_link}}', job_link)
-    rendered = rendered.replace('{{support_link}}', support_link)
-    rendered = rendered.replace('{{manage_subscription_link}}', manage_subscription_link)
-    rendered = rendered.replace('{{privacy_link}}', privacy_link)
-    rendered = rendered.replace('{{unsubscribe_link}}', unsubscribe_link)
-    return rendered
+    # Replace all template variables in a single pass
+    return _COMPILED_TEMPLATE.safe_substitute(
+        candidate_name=candidate_name,
+        job_title=job_title,
+        company_name=company_name,
+        location=location,
+        job_type=job_type,
+        match_score=str(match_score),
+        short_description=short_description,
+        application_status=application_status,
+        applied_at=applied_at,
+        job_link=job_link,
+        support_link=support_link,
+        manage_subscription_link=manage_subscription_link,
+        privacy_link=privacy_link,
+        unsubscribe_link=unsubscribe_link
+    )
 
 def get_email_subject(job_title: str, company_name: str, match_score: str) -> str:
     """
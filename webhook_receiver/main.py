@@ -1,71 +1,102 @@
 import asyncio
-import html
-import re
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+import logging
+import orjson
+import queue
 import os
+from logging.handlers import QueueHandler, QueueListener
 from fastapi import FastAPI, HTTPException, Header, Request
 from fastapi.responses import JSONResponse
 from pydantic import BaseModel, Field
 from typing import Optional
 from dotenv import load_dotenv
 from datetime import datetime
-from webhook_receiver.database import (
-    get_application_details, mark_email_sent, mark_sms_sent
-)
+from webhook_receiver.database import get_application_details, mark_sent
 from webhook_receiver.utils import (
     format_single_requirement, format_phone_number,
     validate_phone_number, validate_webhook_payload,
-    extract_plain_description
+    extract_plain_description, clean_and_truncate_html
 )
 from webhook_receiver.email_template import render_email_template, get_email_subject
-
-from sendgrid import SendGridAPIClient
-from sendgrid.helpers.mail import Mail
-from twilio.rest import Client as TwilioClient
+from webhook_receiver.notifications import (
+    send_email_async, send_sms_async, close_http_client
+)
 
 load_dotenv()
 
-app = FastAPI(
-    title="Email & SMS Webhook Receiver - Production",
-    description="Direct notification FastAPI (no agents) using async concurrency",
-    version="6.0"
+# Handlers only enqueue records; a listener thread does the stdout writes
+_log_queue = queue.SimpleQueue()
+_log_stream_handler = logging.StreamHandler()
+_log_stream_handler.setFormatter(
+    logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s")
 )
+_log_listener = QueueListener(_log_queue, _log_stream_handler)
+# Attached directly: basicConfig would give the QueueHandler a second, full format
+_root_logger = logging.getLogger()
+_root_logger.setLevel(os.getenv("LOG_LEVEL", "INFO").upper())
+_root_logger.addHandler(QueueHandler(_log_queue))
+
+logger = logging.getLogger(__name__)
 
 WEBHOOK_SECRET = os.getenv("WEBHOOK_SECRET")
 MAX_CONCURRENT_TASKS = int(os.getenv("MAX_CONCURRENT_TASKS", "20"))
+THREAD_POOL_SIZE = int(os.getenv("THREAD_POOL_SIZE", str((os.cpu_count() or 1) * 5)))
 semaphore = asyncio.Semaphore(MAX_CONCURRENT_TASKS)
+SHUTDOWN_DRAIN_TIMEOUT = float(os.getenv("SHUTDOWN_DRAIN_TIMEOUT", "30"))
+# Strong references to in-flight notification tasks (asyncio only keeps weak ones)
+background_tasks: set[asyncio.Task] = set()
 
-def send_email(candidate_email, subject, html_content, from_email=None):
-    api_key = os.getenv("SENDGRID_API_KEY")
-    from_email = from_email or os.getenv("SENDGRID_FROM_EMAIL")
-    sg = SendGridAPIClient(api_key)
-    message = Mail(
-        from_email=from_email,
-        to_emails=candidate_email,
-        subject=subject,
-        html_content=html_content
-    )
-    response = sg.send(message)
-    return response.status_code
-
-def send_sms(candidate_mobile, message_body):
-    account_sid = os.getenv("TWILIO_ACCOUNT_SID")
-    auth_token = os.getenv("TWILIO_AUTH_TOKEN")
-    from_phone = os.getenv("TWILIO_PHONE_NUMBER")
-    client = TwilioClient(account_sid, auth_token)
-    message = client.messages.create(
-        body=message_body,
-        from_=from_phone,
-        to=candidate_mobile
+SMS_TEMPLATE = (
+    "Hi {name}! Job Matched: {title} ({score}% fit). "
+    "Auto-applied for you. Recruiter will contact soon!"
+)
+# Long titles are cut before formatting so the 160-char limit keeps the CTA
+SMS_TITLE_MAX_LENGTH = 80
+# Candidate phone fields in order of preference for SMS
+PHONE_KEYS = ('candidate_mobile', 'candidate_work', 'candidate_home')
+
+class ORJSONResponse(JSONResponse):
+    """JSONResponse serialized with orjson (emits bytes directly)."""
+
+    def render(self, content) -> bytes:
+        return orjson.dumps(content)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Listener lives for exactly one app lifetime; records queued before start are flushed then
+    _log_listener.start()
+    # Blocking Supabase calls run in the default executor; size it for I/O
+    asyncio.get_running_loop().set_default_executor(
+        ThreadPoolExecutor(max_workers=THREAD_POOL_SIZE)
     )
-    return message.sid
+    try:
+        yield
+        if background_tasks:
+            logger.info("⏳ Draining %s notification task(s)", len(background_tasks))
+            _, pending = await asyncio.wait(background_tasks, timeout=SHUTDOWN_DRAIN_TIMEOUT)
+            if pending:
+                logger.warning("⚠️ %s notification task(s) still running at shutdown", len(pending))
+        await close_http_client()
+    finally:
+        _log_listener.stop()
+
+app = FastAPI(
+    title="Email & SMS Webhook Receiver - Production",
+    description="Direct notification FastAPI (no agents) using async concurrency",
+    version="6.0",
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse
+)
 
 async def process_notifications_for_application(cand_id: int, requirement_id: str):
     async with semaphore:
         try:
-            app_data = await asyncio.get_event_loop().run_in_executor(
+            loop = asyncio.get_running_loop()
+            app_data = await loop.run_in_executor(
                 None, get_application_details, cand_id, requirement_id)
             if not app_data:
-                print("⏸️ Application not found or already sent. Skipping.")
+                logger.info("⏸️ Application not found or already sent. Skipping.")
                 return
 
             candidate = app_data['candidate']
@@ -80,10 +111,7 @@ async def process_notifications_for_application(cand_id: int, requirement_id: st
             # Always use the extractor!
             raw_description = requirement.get('requirement_description', '')
             plain_desc = extract_plain_description(raw_description)
-            clean_description = re.sub(r'<[^>]+>', '', plain_desc)
-            clean_description = html.unescape(clean_description)
-            if len(clean_description) > 250:
-                clean_description = clean_description[:250].strip() + '...'
+            clean_description = clean_and_truncate_html(plain_desc, 250)
 
             first_name = candidate['candidate_first_name']
             match_score_int = int(requirement['similarity_score'] * 100)
@@ -92,7 +120,10 @@ async def process_notifications_for_application(cand_id: int, requirement_id: st
                 job_type = f"Contract ({requirement['requirement_duration']})"
 
             # EMAIL
-            if notify_email and not email_sent:
+            async def email_chain():
+                if not (notify_email and not email_sent):
+                    logger.info("⏭️ Email not sent (preference false or already sent)")
+                    return False
                 rendered_email_html = render_email_template(
                     candidate_name=first_name,
                     job_title=requirement['requirement_title'],
@@ -108,48 +139,61 @@ async def process_notifications_for_application(cand_id: int, requirement_id: st
                     company_name=requirement.get('client_name', 'N/A'),
                     match_score=str(match_score_int)
                 )
-                await asyncio.get_event_loop().run_in_executor(
-                    None, send_email,
+                await send_email_async(
                     candidate['candidate_email'],
                     email_subject,
-                    rendered_email_html,
-                    os.getenv('SENDGRID_FROM_EMAIL')
+                    rendered_email_html
                 )
-                await asyncio.get_event_loop().run_in_executor(
-                    None, mark_email_sent, application_id)
-                print("✅ Email sent")
-            else:
-                print("⏭️ Email not sent (preference false or already sent)")
+                logger.info("✅ Email sent for application_id %s", application_id)
+                return True
 
             # SMS
-            if notify_sms and not sms_sent:
-                candidate_mobile = (
-                    candidate.get('candidate_mobile') or 
-                    candidate.get('candidate_work') or 
-                    candidate.get('candidate_home') or 
-                    ''
+            async def sms_chain():
+                if not (notify_sms and not sms_sent):
+                    logger.info("⏭️ SMS not sent (preference false or already sent)")
+                    return False
+                candidate_mobile = next(
+                    (candidate[key] for key in PHONE_KEYS if candidate.get(key)), ''
                 )
                 formatted_phone = format_phone_number(candidate_mobile)
                 if candidate_mobile and validate_phone_number(formatted_phone):
-                    sms_text = (
-                        f"Hi {first_name or 'Candidate'}! "
-                        f"Job Matched: {requirement['requirement_title']} "
-                        f"({match_score_int}% fit). "
-                        "Auto-applied for you. Recruiter will contact soon!"
+                    sms_text = SMS_TEMPLATE.format(
+                        name=first_name or 'Candidate',
+                        title=requirement['requirement_title'][:SMS_TITLE_MAX_LENGTH],
+                        score=match_score_int
                     )[:160]
-                    await asyncio.get_event_loop().run_in_executor(
-                        None, send_sms, formatted_phone, sms_text
-                    )
-                    await asyncio.get_event_loop().run_in_executor(
-                        None, mark_sms_sent, application_id)
-                    print("✅ SMS sent")
-                else:
-                    print("⚠️ No valid phone for SMS")
-            else:
-                print("⏭️ SMS not sent (preference false or already sent)")
+                    await send_sms_async(formatted_phone, sms_text)
+                    logger.info("✅ SMS sent for application_id %s", application_id)
+                    return True
+                logger.warning("⚠️ No valid phone for SMS (application_id %s)", application_id)
+                return False
+
+            # Both channels run concurrently; a failure in one does not cancel the other
+            email_result, sms_result = await asyncio.gather(
+                email_chain(), sms_chain(), return_exceptions=True)
+            if isinstance(email_result, Exception):
+                logger.error("❌ Error sending email: %s", email_result)
+            if isinstance(sms_result, Exception):
+                logger.error("❌ Error sending SMS: %s", sms_result)
+
+            # One status write covering whichever channels actually went out
+            await loop.run_in_executor(
+                None, mark_sent, application_id,
+                email_result is True, sms_result is True
+            )
 
         except Exception as e:
-            print("❌ Error in notification:", e)
+            logger.error("❌ Error in notification: %s", e)
+
+def has_pending_notification(record: dict) -> bool:
+    """
+    Cheap pre-check on the trigger row: False only when the payload itself
+    shows every channel as opted out or already sent. Missing flags are
+    treated as unknown, so the full DB lookup still decides.
+    """
+    email_done = record.get('notify_email') is False or record.get('email_sent') is True
+    sms_done = record.get('notify_sms') is False or record.get('sms_sent') is True
+    return not (email_done and sms_done)
 
 class WebhookPayload(BaseModel):
     type: str
@@ -164,15 +208,15 @@ async def webhook_handler(
     x_webhook_secret: Optional[str] = Header(None, alias="X-Webhook-Secret")
 ):
     try:
-        payload = await request.json()
+        payload = orjson.loads(await request.body())
         if WEBHOOK_SECRET and x_webhook_secret != WEBHOOK_SECRET:
-            print(f"❌ Invalid webhook secret")
+            logger.warning("❌ Invalid webhook secret")
             raise HTTPException(status_code=401, detail="Invalid webhook secret")
-        print(f"📨 WEBHOOK RECEIVED: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+        logger.info("📨 WEBHOOK RECEIVED")
         if not validate_webhook_payload(payload):
             raise HTTPException(status_code=400, detail="Invalid payload structure")
         if payload['type'] != "INSERT" or payload['table'] != "job_application_tracking":
-            return JSONResponse(
+            return ORJSONResponse(
                 status_code=200,
                 content={"status": "ignored"}
             )
@@ -184,10 +228,22 @@ async def webhook_handler(
                 status_code=400, 
                 detail="cand_id and requirement_id required"
             )
-        asyncio.create_task(
+        if not has_pending_notification(record):
+            logger.info("⏭️ Nothing to send for cand_id %s, requirement_id %s", cand_id, requirement_id)
+            return ORJSONResponse(
+                status_code=202,
+                content={
+                    "status": "skipped_opted_out",
+                    "cand_id": cand_id,
+                    "requirement_id": requirement_id
+                }
+            )
+        task = asyncio.create_task(
             process_notifications_for_application(cand_id, requirement_id)
         )
-        return JSONResponse(
+        background_tasks.add(task)
+        task.add_done_callback(background_tasks.discard)
+        return ORJSONResponse(
             status_code=202,
             content={
                 "status": "accepted",
@@ -201,7 +257,7 @@ async def webhook_handler(
     except HTTPException:
         raise
     except Exception as e:
-        print(f"\n❌ Error: {str(e)}\n")
+        logger.error("❌ Error: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/")
@@ -220,10 +276,14 @@ async def health_check():
         "timestamp": datetime.now().isoformat(),
         "concurrency": {
             "max_concurrent_tasks": MAX_CONCURRENT_TASKS,
-            "active_tasks": MAX_CONCURRENT_TASKS - semaphore._value
+            "active_tasks": MAX_CONCURRENT_TASKS - semaphore._value,
+            "thread_pool_size": THREAD_POOL_SIZE
         }
     }
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000, log_level="info")
\ No newline at end of file
+    uvicorn.run(
+        app, host="0.0.0.0", port=8000, log_level="info",
+        loop="uvloop", http="httptools"
+    )
\ No newline at end of file
@@ -1,15 +1,28 @@
+import asyncio
 import os
+import httpx
 from sendgrid import SendGridAPIClient
 from sendgrid.helpers.mail import Mail
 from twilio.rest import Client as TwilioClient
 from datetime import datetime
+from email.utils import parseaddr
+from typing import Optional
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Provider credentials are read once; env changes require a restart
+SENDGRID_API_KEY = os.getenv("SENDGRID_API_KEY")
+SENDGRID_FROM_EMAIL = os.getenv("SENDGRID_FROM_EMAIL")
+TWILIO_ACCOUNT_SID = os.getenv("TWILIO_ACCOUNT_SID")
+TWILIO_AUTH_TOKEN = os.getenv("TWILIO_AUTH_TOKEN")
+TWILIO_PHONE_NUMBER = os.getenv("TWILIO_PHONE_NUMBER")
 
 def send_email(candidate_email, subject, html_content, from_email=None):
-    api_key = os.getenv("SENDGRID_API_KEY")
-    from_email = from_email or os.getenv("SENDGRID_FROM_EMAIL")
-    if not api_key or not from_email:
+    from_email = from_email or SENDGRID_FROM_EMAIL
+    if not SENDGRID_API_KEY or not from_email:
         raise Exception("Missing SendGrid config")
-    sg = SendGridAPIClient(api_key)
+    sg = SendGridAPIClient(SENDGRID_API_KEY)
     message = Mail(
         from_email=from_email,
         to_emails=candidate_email,
@@ -20,15 +33,76 @@ def send_email(candidate_email, subject, html_content, from_email=None):
     return response.status_code
 
 def send_sms(candidate_mobile, message_body):
-    account_sid = os.getenv("TWILIO_ACCOUNT_SID")
-    auth_token = os.getenv("TWILIO_AUTH_TOKEN")
-    from_phone = os.getenv("TWILIO_PHONE_NUMBER")
-    if not account_sid or not auth_token or not from_phone:
+    if not TWILIO_ACCOUNT_SID or not TWILIO_AUTH_TOKEN or not TWILIO_PHONE_NUMBER:
         raise Exception("Missing Twilio config")
-    client = TwilioClient(account_sid, auth_token)
+    client = TwilioClient(TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN)
     message = client.messages.create(
         body=message_body,
-        from_=from_phone,
+        from_=TWILIO_PHONE_NUMBER,
         to=candidate_mobile
     )
-    return message.sid
\ No newline at end of file
+    return message.sid
+
+SENDGRID_SEND_URL = "https://api.sendgrid.com/v3/mail/send"
+TWILIO_MESSAGES_URL = "https://api.twilio.com/2010-04-01/Accounts/{account_sid}/Messages.json"
+SENDGRID_AUTH_HEADERS = {"Authorization": f"Bearer {SENDGRID_API_KEY}"}
+
+# Shared async HTTP client so concurrent sends multiplex over pooled connections;
+# created on first use and reset by close_http_client() for the next app lifetime
+_http_client: Optional[httpx.AsyncClient] = None
+
+def get_http_client() -> httpx.AsyncClient:
+    global _http_client
+    if _http_client is None:
+        _http_client = httpx.AsyncClient(
+            limits=httpx.Limits(max_connections=100, max_keepalive_connections=50),
+            timeout=httpx.Timeout(15.0, connect=5.0)
+        )
+    return _http_client
+
+# Per-provider caps on in-flight requests to stay under SendGrid/Twilio rate limits
+SENDGRID_MAX_CONCURRENCY = int(os.getenv("SENDGRID_MAX_CONCURRENCY", "50"))
+TWILIO_MAX_CONCURRENCY = int(os.getenv("TWILIO_MAX_CONCURRENCY", "20"))
+sendgrid_semaphore = asyncio.Semaphore(SENDGRID_MAX_CONCURRENCY)
+twilio_semaphore = asyncio.Semaphore(TWILIO_MAX_CONCURRENCY)
+
+async def close_http_client():
+    global _http_client
+    if _http_client is not None:
+        client, _http_client = _http_client, None
+        await client.aclose()
+
+async def send_email_async(candidate_email, subject, html_content, from_email=None):
+    from_email = from_email or SENDGRID_FROM_EMAIL
+    if not SENDGRID_API_KEY or not from_email:
+        raise Exception("Missing SendGrid config")
+    # "Display Name <addr>" must be split; SendGrid rejects it as a bare email
+    from_name, from_addr = parseaddr(from_email)
+    sender = {"email": from_addr, "name": from_name} if from_name else {"email": from_addr}
+    async with sendgrid_semaphore:
+        response = await get_http_client().post(
+            SENDGRID_SEND_URL,
+            json={
+                "personalizations": [{"to": [{"email": candidate_email}]}],
+                "from": sender,
+                "subject": subject,
+                "content": [{"type": "text/html", "value": html_content}]
+            },
+            headers=SENDGRID_AUTH_HEADERS
+        )
+    if response.is_error:
+        raise Exception(f"SendGrid returned {response.status_code}: {response.text}")
+    return response.status_code
+
+async def send_sms_async(candidate_mobile, message_body):
+    if not TWILIO_ACCOUNT_SID or not TWILIO_AUTH_TOKEN or not TWILIO_PHONE_NUMBER:
+        raise Exception("Missing Twilio config")
+    async with twilio_semaphore:
+        response = await get_http_client().post(
+            TWILIO_MESSAGES_URL.format(account_sid=TWILIO_ACCOUNT_SID),
+            data={"Body": message_body, "From": TWILIO_PHONE_NUMBER, "To": candidate_mobile},
+            auth=(TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN)
+        )
+    if response.is_error:
+        raise Exception(f"Twilio returned {response.status_code}: {response.text}")
+    return response.json()["sid"]
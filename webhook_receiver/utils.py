@@ -1,90 +1,202 @@
-from typing import Dict
+from functools import lru_cache
+from typing import Dict, List, Optional
+import html
+import logging
 import re
-import json
+import orjson
 
-def extract_plain_description(raw_desc):
+logger = logging.getLogger(__name__)
+
+_PHONE_STRIP_RE = re.compile(r'[^\d+]')
+# Deletes every ASCII character except digits and '+'
+_PHONE_STRIP_TABLE = str.maketrans('', '', ''.join(
+    chr(c) for c in range(128) if chr(c) not in '0123456789+'
+))
+_HTML_TAG_RE = re.compile(r'<[^>]+>')
+_REQUIRED_PAYLOAD_FIELDS = frozenset(('type', 'table', 'record'))
+_REQUIRED_RECORD_FIELDS = frozenset(('cand_id', 'requirement_id'))
+# Larger descriptions are parsed uncached so the cache never pins big JD blobs
+_DESCRIPTION_CACHE_MAX_LEN = 4096
+
+def extract_plain_description(raw_desc, max_len: Optional[int] = None):
     """
     Accepts a job description string that may be:
       - Plain text
       - JSON string with a 'description' key (as produced by some parsers/storage)
-    Returns only the intended plain text.
+    Returns only the intended plain text, cut to max_len characters if given.
     """
+    if not isinstance(raw_desc, str):
+        return raw_desc
+    # Only a JSON object can carry 'description'; plain text skips the parser
+    if not raw_desc.lstrip().startswith('{'):
+        return raw_desc if max_len is None else raw_desc[:max_len]
+    if len(raw_desc) > _DESCRIPTION_CACHE_MAX_LEN:
+        return _parse_json_description.__wrapped__(raw_desc, max_len)
+    return _parse_json_description(raw_desc, max_len)
+
+@lru_cache(maxsize=1024)
+def _parse_json_description(raw_desc: str, max_len: Optional[int] = None):
+    # Cached so a description shared by many candidates' matches is parsed once;
+    # the key holds raw_desc, so callers only route small inputs through the cache
     try:
-        jd_obj = json.loads(raw_desc)
+        jd_obj = orjson.loads(raw_desc)
         if isinstance(jd_obj, dict) and "description" in jd_obj:
-            return jd_obj["description"]
+            description = jd_obj["description"]
+            if max_len is not None and isinstance(description, str):
+                return description[:max_len]
+            return description
     except Exception:
         pass
-    return raw_desc
+    return raw_desc if max_len is None else raw_desc[:max_len]
 
-def format_single_requirement(requirement: Dict) -> str:
-    description = extract_plain_description(requirement.get('requirement_description', 'N/A'))    
-    if len(description) > 300:
-        description = description[:300] + '...'
-    similarity_score = requirement.get('similarity_score', 0.0)
-    match_percentage = f"{similarity_score * 100:.1f}%" if similarity_score else "N/A"
-    min_pay = requirement.get('min_payrate')
-    max_pay = requirement.get('max_payrate')
-    if min_pay and max_pay:
-        if min_pay == max_pay:
-            pay_rate_str = f"${float(min_pay):.2f}/hr"
-        else:
-            pay_rate_str = f"${float(min_pay):.2f} - ${float(max_pay):.2f}/hr"
-    elif min_pay:
-        pay_rate_str = f"${float(min_pay):.2f}+/hr"
-    elif max_pay:
-        pay_rate_str = f"Up to ${float(max_pay):.2f}/hr"
-    else:
-        pay_rate_str = "Negotiable"
-    duration = requirement.get('requirement_duration')
-    duration_str = str(duration).strip() if duration else "Not specified"
-    open_date = requirement.get('requirement_open_date')
-    open_date_str = str(open_date) if open_date else "ASAP"
-    location = requirement.get('location', 'Remote')
-    formatted = f"""
-    Job Requirement:
-    - Title: {requirement.get('requirement_title', 'N/A')}
-    - Client: {requirement.get('client_name', 'N/A')}
-    - Location: {location}
-    - Pay Rate: {pay_rate_str}
-    - Duration: {duration_str}
-    - Start Date: {open_date_str}
-    - Match Score: {match_percentage}
-    - Description: {description}
+# Indexed by (has_min << 1) | has_max
+_PAY_RATE_FORMATS = (
+    lambda min_rate, max_rate: "Negotiable",
+    lambda min_rate, max_rate: f"Up to ${max_rate:.2f}/hr",
+    lambda min_rate, max_rate: f"${min_rate:.2f}+/hr",
+    lambda min_rate, max_rate: (
+        f"${min_rate:.2f}/hr" if min_rate == max_rate
+        else f"${min_rate:.2f} - ${max_rate:.2f}/hr"
+    ),
+)
+
+@lru_cache(maxsize=1024)
+def _format_payrate(min_pay, max_pay) -> str:
+    # Coerce once (Decimal/str from Postgres); emptiness is judged on the raw value
+    min_rate = float(min_pay) if min_pay else None
+    max_rate = float(max_pay) if max_pay else None
+    key = (min_rate is not None) << 1 | (max_rate is not None)
+    return _PAY_RATE_FORMATS[key](min_rate, max_rate)
+
+def clean_and_truncate_html(text: str, limit: int = 250) -> str:
     """
-    return formatted.strip()
+    Strip HTML tags, unescape entities and truncate to `limit` characters
+    (plus '...') in one pass, stopping as soon as the limit is exceeded.
+    """
+    if '<' not in text:
+        cleaned = html.unescape(text) if '&' in text else text
+    else:
+        pieces = []
+        length = 0
+        pos = 0
+        for tag in _HTML_TAG_RE.finditer(text):
+            segment = html.unescape(text[pos:tag.start()])
+            pieces.append(segment)
+            length += len(segment)
+            pos = tag.end()
+            if length > limit:
+                break
+        else:
+            pieces.append(html.unescape(text[pos:]))
+        cleaned = ''.join(pieces)
+    if len(cleaned) > limit:
+        return cleaned[:limit].strip() + '...'
+    return cleaned
+
+@lru_cache(maxsize=256)
+def _format_match_percentage(similarity_score: float) -> str:
+    return f"{similarity_score * 100:.1f}%"
+
+_REQ_TEMPLATE = (
+    "Job Requirement:\n"
+    "    - Title: {title}\n"
+    "    - Client: {client}\n"
+    "    - Location: {location}\n"
+    "    - Pay Rate: {pay}\n"
+    "    - Duration: {duration}\n"
+    "    - Start Date: {date}\n"
+    "    - Match Score: {score}\n"
+    "    - Description: {desc}"
+)
+# Same layout with the pay/duration/start-date fallbacks baked in
+_REQ_TEMPLATE_DEFAULTS = _REQ_TEMPLATE.replace(
+    '{pay}', 'Negotiable'
+).replace('{duration}', 'Not specified').replace('{date}', 'ASAP')
+
+def format_single_requirement(requirement: Dict) -> str:
+    get = requirement.get
+    # 301 chars are enough to tell whether the 300-char cut needs '...'
+    head = extract_plain_description(get('requirement_description', 'N/A'), max_len=301)
+    description = head if len(head) <= 300 else head[:300] + '...'
+    similarity_score = get('similarity_score', 0.0)
+    match_percentage = _format_match_percentage(similarity_score) if similarity_score else "N/A"
+    min_pay = get('min_payrate')
+    max_pay = get('max_payrate')
+    duration = get('requirement_duration')
+    open_date = get('requirement_open_date')
+    fields = {
+        'title': get('requirement_title', 'N/A'),
+        'client': get('client_name', 'N/A'),
+        'location': get('location', 'Remote'),
+        'score': match_percentage,
+        'desc': description
+    }
+    # rstrip() returns the same object unless the description ends in whitespace
+    if not (min_pay or max_pay or duration or open_date):
+        return _REQ_TEMPLATE_DEFAULTS.format_map(fields).rstrip()
+    fields['pay'] = _format_payrate(min_pay, max_pay)
+    fields['duration'] = str(duration).strip() if duration else "Not specified"
+    fields['date'] = str(open_date) if open_date else "ASAP"
+    return _REQ_TEMPLATE.format_map(fields).rstrip()
 
+def format_requirements(requirements: List[Dict]) -> str:
+    """Format several requirements into one block, separated by blank lines."""
+    return '\n\n'.join([format_single_requirement(requirement) for requirement in requirements])
+
+@lru_cache(maxsize=1024)
 def extract_first_name(full_name: str) -> str:
     if not full_name:
         return "Candidate"
-    parts = full_name.strip().split()
+    # Stop after the first token; split() already skips leading whitespace
+    parts = full_name.split(None, 1)
     return parts[0] if parts else "Candidate"
 
+def _strip_phone_chars(phone: str) -> str:
+    phone = phone.translate(_PHONE_STRIP_TABLE)
+    if not phone.isascii():
+        # Non-ASCII leftovers (e.g. Unicode digits) need the regex's \d semantics
+        phone = _PHONE_STRIP_RE.sub('', phone)
+    return phone
+
 def format_phone_number(phone: str, default_country_code: str = "+1") -> str:
     if not phone:
         return None
-    phone = re.sub(r'[^\d+]', '', phone)
+    if phone[0] == '+':
+        # Country code already present: clean E.164 is returned as-is,
+        # otherwise only the part after '+' needs cleaning
+        if validate_phone_number(phone):
+            return phone
+        return '+' + _strip_phone_chars(phone[1:])
+    phone = _strip_phone_chars(phone)
     if phone.startswith('+'):
         return phone
-    return f"{default_country_code}{phone}"
+    return default_country_code + phone
 
 def validate_phone_number(phone: str) -> bool:
     if not phone:
         return False
-    pattern = r'^\+\d{10,15}$'
-    return bool(re.match(pattern, phone))
+    # '+' then 10-15 ASCII digits; both checks are single C-level scans
+    return (
+        11 <= len(phone) <= 16 and phone[0] == '+'
+        and phone.isascii() and phone[1:].isdecimal()
+    )
 
 def validate_webhook_payload(payload: dict) -> bool:
-    required_fields = ['type', 'table', 'record']
-    for field in required_fields:
-        if field not in payload:
-            print(f"❌ Missing required field: {field}")
-            return False
-    record = payload.get('record', {})
-    if 'cand_id' not in record:
-        print("❌ Missing cand_id in record")
+    if not isinstance(payload, dict):
+        logger.warning("❌ Payload must be a JSON object")
+        return False
+    missing = _REQUIRED_PAYLOAD_FIELDS - payload.keys()
+    if missing:
+        if logger.isEnabledFor(logging.WARNING):
+            logger.warning("❌ Missing required field(s): %s", sorted(missing))
+        return False
+    record = payload['record']
+    if not isinstance(record, dict):
+        logger.warning("❌ record must be a JSON object")
         return False
-    if 'requirement_id' not in record:
-        print("❌ Missing requirement_id in record")
+    missing = _REQUIRED_RECORD_FIELDS - record.keys()
+    if missing:
+        if logger.isEnabledFor(logging.WARNING):
+            logger.warning("❌ Missing %s in record", sorted(missing))
         return False
     return True
\ No newline at end of file